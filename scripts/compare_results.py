@@ -0,0 +1,248 @@
+import argparse
+import glob
+import sys
+import pandas as pd
+from scipy.stats import mannwhitneyu
+
+# Latency column and success flag for each measured operation
+OPERATIONS = {
+    'upload': ('upload_time_sec', 'upload_success'),
+    'retrieval': ('retrieval_time_sec', 'retrieval_success'),
+}
+
+# Latencies are only comparable between rows written the same way, so the
+# codec and whether the upload was a dedup hit are part of each cell. Each
+# size class holds files of different sizes, so cells are per file; pooling
+# them would turn a different file mix into a latency shift.
+GROUP_COLUMNS = ['storage_system', 'durability_level', 'compression_codec', 'dedup_hit',
+                 'file_category', 'file_name']
+
+# Values for columns missing from runs recorded before they existed
+COLUMN_DEFAULTS = {
+    'durability_level': 'default',
+    'compression_codec': 'none',
+    'dedup_hit': False,
+}
+
+REPORT_COLUMNS = GROUP_COLUMNS + [
+    'operation', 'n_baseline', 'n_candidate', 'baseline_success_pct', 'candidate_success_pct',
+    'baseline_median_sec', 'candidate_median_sec', 'change_pct', 'p_value', 'p_adjusted',
+    'cliffs_delta', 'verdict', 'reason'
+]
+
+# Columns every result CSV must have
+REQUIRED_COLUMNS = [col for col in GROUP_COLUMNS if col not in COLUMN_DEFAULTS] + [
+    col for pair in OPERATIONS.values() for col in pair]
+
+# Verdicts that make the gate fail
+FAILING_VERDICTS = ('REGRESSION', 'MISSING DATA')
+
+def load_result_set(patterns):
+    """Load and concatenate every CSV matching the given paths or globs
+
+    Raises FileNotFoundError if any pattern matches no file and ValueError
+    if a file lacks the columns the comparison needs.
+    """
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern))
+        if not matches:
+            raise FileNotFoundError(f"no result files match '{pattern}'")
+        paths.extend(matches)
+
+    frames = []
+    for path in paths:
+        df = pd.read_csv(path)
+        for col, default in COLUMN_DEFAULTS.items():
+            if col not in df.columns:
+                # Runs recorded before the durability, dedup and compression
+                # options existed used the defaults
+                df[col] = default
+        df['dedup_hit'] = df['dedup_hit'].astype(str).str.lower() == 'true'
+        missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+        if missing:
+            raise ValueError(f"{path} lacks columns {missing}")
+        df['source_file'] = path
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True)
+
+def cliffs_delta(u_statistic, n_candidate, n_baseline):
+    """Cliff's delta from the Mann-Whitney U of candidate vs baseline
+
+    Ranges from -1 to 1; positive means candidate latencies tend to be larger.
+    """
+    return 2.0 * u_statistic / (n_candidate * n_baseline) - 1.0
+
+def holm_adjust(p_values):
+    """Holm-Bonferroni adjusted p-values, in the order given"""
+    order = sorted(range(len(p_values)), key=lambda i: p_values[i])
+    adjusted = [0.0] * len(p_values)
+    running_max = 0.0
+    for rank, i in enumerate(order):
+        running_max = max(running_max, min(1.0, (len(p_values) - rank) * p_values[i]))
+        adjusted[i] = running_max
+    return adjusted
+
+def success_pct(attempts, success_col):
+    return attempts[success_col].astype(bool).mean() * 100 if len(attempts) else float('nan')
+
+def compare_result_sets(baseline, candidate, alpha=0.05, threshold_pct=10.0,
+                        min_effect=0.33, min_samples=3, max_success_drop_pct=0.0):
+    """Compare success rates and latencies per backend, durability level, codec,
+    dedup outcome, operation and file
+
+    A ``--compress`` or ``--dedup`` candidate is thus never scored against
+    plain baseline rows: the baseline's plain cells come up as missing
+    candidate data instead of as latency changes.
+
+    A cell is a regression when the candidate's success rate is more than
+    ``max_success_drop_pct`` points below the baseline's, or when the
+    Mann-Whitney test on successful latencies is significant at ``alpha``
+    after a Holm correction across all tested cells, the median latency
+    grew by more than ``threshold_pct`` percent and |Cliff's delta| is at
+    least ``min_effect`` (improvements likewise).
+    A cell with enough baseline samples but too few successful candidate
+    samples is reported as missing data.
+    """
+    rows = []
+    for operation, (latency_col, success_col) in OPERATIONS.items():
+        base_groups = dict(list(baseline.groupby(GROUP_COLUMNS)))
+        cand_groups = dict(list(candidate.groupby(GROUP_COLUMNS)))
+
+        for key in sorted(set(base_groups) | set(cand_groups)):
+            base_all = base_groups.get(key, baseline.iloc[0:0])
+            cand_all = cand_groups.get(key, candidate.iloc[0:0])
+            base = base_all[base_all[success_col].astype(bool)][latency_col]
+            cand = cand_all[cand_all[success_col].astype(bool)][latency_col]
+            base_success = success_pct(base_all, success_col)
+            cand_success = success_pct(cand_all, success_col)
+
+            row = dict(zip(GROUP_COLUMNS, key))
+            row.update({
+                'operation': operation,
+                'n_baseline': len(base),
+                'n_candidate': len(cand),
+                'baseline_success_pct': base_success,
+                'candidate_success_pct': cand_success,
+                'baseline_median_sec': base.median() if len(base) else float('nan'),
+                'candidate_median_sec': cand.median() if len(cand) else float('nan'),
+                'change_pct': float('nan'),
+                'p_value': float('nan'),
+                'p_adjusted': float('nan'),
+                'cliffs_delta': float('nan'),
+                'verdict': 'insufficient data',
+                'reason': '',
+            })
+
+            if len(base_all) and len(cand_all) and base_success - cand_success > max_success_drop_pct:
+                row.update({
+                    'verdict': 'REGRESSION',
+                    'reason': f"success rate {base_success:.1f}% -> {cand_success:.1f}%",
+                })
+            elif len(base) >= min_samples and len(cand) < min_samples:
+                row.update({
+                    'verdict': 'MISSING DATA',
+                    'reason': f"only {len(cand)} successful candidate samples",
+                })
+            elif len(base) >= min_samples and len(cand) >= min_samples:
+                u_statistic, p_value = mannwhitneyu(cand, base, alternative='two-sided')
+                delta = cliffs_delta(u_statistic, len(cand), len(base))
+                base_median = base.median()
+                change = (cand.median() - base_median) / base_median * 100 if base_median > 0 else 0.0
+
+                # The verdict waits for the multiple-comparison correction
+                row.update({
+                    'change_pct': change,
+                    'p_value': p_value,
+                    'cliffs_delta': delta,
+                    'verdict': 'no change',
+                })
+            rows.append(row)
+
+    tested = [row for row in rows if not pd.isna(row['p_value'])]
+    for row, p_adjusted in zip(tested, holm_adjust([row['p_value'] for row in tested])):
+        row['p_adjusted'] = p_adjusted
+        if p_adjusted < alpha and abs(row['cliffs_delta']) >= min_effect:
+            if row['change_pct'] > threshold_pct:
+                row.update({'verdict': 'REGRESSION', 'reason': 'latency'})
+            elif row['change_pct'] < -threshold_pct:
+                row.update({'verdict': 'improvement', 'reason': 'latency'})
+
+    return pd.DataFrame(rows, columns=REPORT_COLUMNS)
+
+def print_report(report):
+    """Print one line per comparison cell and the verdict counts"""
+    print("📊 BASELINE vs CANDIDATE LATENCY COMPARISON")
+    print("=" * 60)
+
+    for _, r in report.iterrows():
+        print(f"   {r['storage_system']:8} | {r['durability_level']:12} | {r['compression_codec']:4} | "
+              f"{'dedup' if r['dedup_hit'] else 'write':5} | {r['operation']:9} | {r['file_category']:6} | "
+              f"{r['file_name'][:24]:24} | "
+              f"n={r['n_baseline']:3d}/{r['n_candidate']:3d} | "
+              f"ok {r['baseline_success_pct']:5.1f}% -> {r['candidate_success_pct']:5.1f}% | "
+              f"median {r['baseline_median_sec']:8.4f}s -> {r['candidate_median_sec']:8.4f}s "
+              f"({r['change_pct']:+6.1f}%) | p={r['p_value']:.4f} (holm {r['p_adjusted']:.4f}) | δ={r['cliffs_delta']:+.2f} | {r['verdict']}"
+              f"{' (' + r['reason'] + ')' if r['reason'] else ''}")
+
+    regressions = report[report['verdict'] == 'REGRESSION']
+    improvements = report[report['verdict'] == 'improvement']
+    missing = report[report['verdict'] == 'MISSING DATA']
+    print("-" * 60)
+    print(f"❌ Regressions: {len(regressions)}")
+    print(f"⚠️  Missing candidate data: {len(missing)}")
+    print(f"✅ Improvements: {len(improvements)}")
+
+def main(argv=None):
+    """Command-line entry point
+
+    Returns 1 on a regression or missing candidate data and 2 when the
+    result sets cannot be loaded, so a broken pipeline is not read as a
+    regression.
+    """
+    parser = argparse.ArgumentParser(
+        description="Compare a candidate result set against a baseline and fail on regressions")
+    parser.add_argument("--baseline", nargs='+', required=True,
+                        help="baseline result CSVs (paths or globs)")
+    parser.add_argument("--candidate", nargs='+', required=True,
+                        help="candidate result CSVs (paths or globs)")
+    parser.add_argument("--alpha", type=float, default=0.05,
+                        help="family-wise significance level, Holm-corrected across all tested cells")
+    parser.add_argument("--threshold-pct", type=float, default=10.0,
+                        help="minimum change in median latency to report, in percent")
+    parser.add_argument("--min-effect", type=float, default=0.33,
+                        help="minimum |Cliff's delta| to report")
+    parser.add_argument("--min-samples", type=int, default=3,
+                        help="minimum samples per side to run the test")
+    parser.add_argument("--max-success-drop-pct", type=float, default=0.0,
+                        help="largest tolerated drop in success rate, in percentage points")
+    parser.add_argument("--allow-missing", action="store_true",
+                        help="do not fail when the candidate lacks samples for a baseline cell")
+    parser.add_argument("--output", help="optional CSV path for the full report")
+    args = parser.parse_args(argv)
+
+    try:
+        baseline = load_result_set(args.baseline)
+        candidate = load_result_set(args.candidate)
+    except (OSError, ValueError) as e:
+        # pandas parse errors are ValueErrors
+        print(f"ERROR: cannot load result sets: {e}", file=sys.stderr)
+        return 2
+
+    report = compare_result_sets(baseline, candidate, alpha=args.alpha,
+                                 threshold_pct=args.threshold_pct,
+                                 min_effect=args.min_effect,
+                                 min_samples=args.min_samples,
+                                 max_success_drop_pct=args.max_success_drop_pct)
+    print_report(report)
+
+    if args.output:
+        report.to_csv(args.output, index=False)
+        print(f"💾 Report saved to: {args.output}")
+
+    # Non-zero exit lets a pipeline block the rollout
+    failing = [v for v in FAILING_VERDICTS if not (v == 'MISSING DATA' and args.allow_missing)]
+    return 1 if report['verdict'].isin(failing).any() else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,333 @@
+import gzip
+import json
+import os
+import time
+import zlib
+
+# Optional codecs; gzip from the standard library is always available
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+COPY_BUFFER = 1024 * 1024
+
+class _Lz4Compressor:
+    """LZ4 frame compressor with the compressobj interface of zlib and zstd"""
+
+    def __init__(self, level):
+        self._compressor = lz4.frame.LZ4FrameCompressor(compression_level=level)
+        self._header = self._compressor.begin()
+
+    def compress(self, data):
+        header, self._header = self._header, b''
+        return header + self._compressor.compress(data)
+
+    def flush(self):
+        return self._header + self._compressor.flush()
+
+CODECS = {
+    'gzip': {
+        'available': True,
+        'default_level': 6,
+        'levels': (0, 9),
+        'compress': lambda data, level: gzip.compress(data, compresslevel=level),
+        # wbits=31 produces and expects a gzip header
+        'compressor': lambda level: zlib.compressobj(level, zlib.DEFLATED, 31),
+        'decompressor': lambda: zlib.decompressobj(31),
+    },
+    'zstd': {
+        'available': zstandard is not None,
+        'default_level': 3,
+        'levels': (1, 22),
+        'compress': lambda data, level: zstandard.ZstdCompressor(level=level).compress(data),
+        'compressor': lambda level: zstandard.ZstdCompressor(level=level).compressobj(),
+        'decompressor': lambda: zstandard.ZstdDecompressor().decompressobj(),
+    },
+    'lz4': {
+        'available': lz4 is not None,
+        'default_level': 0,
+        'levels': (0, 16),
+        'compress': lambda data, level: lz4.frame.compress(data, compression_level=level),
+        'compressor': _Lz4Compressor,
+        'decompressor': lambda: lz4.frame.LZ4FrameDecompressor(),
+    },
+}
+
+# Extensions that are already compressed are never sent through a codec
+INCOMPRESSIBLE_TYPES = {
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.heic',
+    '.mp4', '.mkv', '.mov', '.webm', '.avi',
+    '.mp3', '.aac', '.ogg', '.flac', '.m4a',
+    '.zip', '.gz', '.zst', '.lz4', '.7z',
+}
+
+# Raw media and sidecar text that usually compress well
+COMPRESSIBLE_TYPES = {
+    '.wav', '.aiff', '.bmp', '.tif', '.tiff', '.raw', '.yuv', '.pcm',
+    '.json', '.xml', '.txt', '.csv', '.srt', '.vtt',
+}
+
+def available_codecs():
+    """Names of the codecs that can be used in this environment"""
+    return [name for name, codec in CODECS.items() if codec['available']]
+
+def _check_codec(codec, level):
+    """Return (codec, level) with the default level filled in, or raise ValueError"""
+    if codec not in CODECS:
+        raise ValueError(f"Unknown codec '{codec}', expected one of {list(CODECS)}")
+    if not CODECS[codec]['available']:
+        raise ValueError(f"Codec '{codec}' is not installed (pip install {'zstandard' if codec == 'zstd' else codec})")
+    if level is None:
+        level = CODECS[codec]['default_level']
+    if isinstance(level, bool) or not isinstance(level, int):
+        raise ValueError(f"Level for {codec} must be an integer, got {level!r}")
+    low, high = CODECS[codec]['levels']
+    if not low <= level <= high:
+        raise ValueError(f"Level {level} is out of range for {codec} ({low}..{high})")
+    return codec, level
+
+def build_policy(codec=None, level=None, overrides=None):
+    """Map file extensions to (codec, level), or None to send raw bytes
+
+    ``overrides`` maps extensions to ``[codec, level]``, ``[codec]`` (the
+    codec's default level) or None (never compress) and is merged over the
+    defaults, so individual types can get their own codec. Extensions
+    missing from the policy fall back to the ``'*'`` entry and are still
+    subject to the first-block sample check.
+    """
+    if codec is None:
+        codec = 'zstd' if CODECS['zstd']['available'] else 'gzip'
+    choice = _check_codec(codec, level)
+
+    policy = {ext: None for ext in INCOMPRESSIBLE_TYPES}
+    policy.update({ext: choice for ext in COMPRESSIBLE_TYPES})
+    policy['*'] = choice
+
+    for ext, entry in (overrides or {}).items():
+        ext = ext.lower()
+        if ext != '*' and not ext.startswith('.'):
+            ext = '.' + ext
+        if entry is None:
+            policy[ext] = None
+            continue
+        if isinstance(entry, str):
+            entry = [entry]
+        if not isinstance(entry, (list, tuple)) or not 1 <= len(entry) <= 2:
+            raise ValueError(f"Policy entry for '{ext}' must be [codec, level], [codec] or null, got {entry!r}")
+        policy[ext] = _check_codec(entry[0], entry[1] if len(entry) == 2 else None)
+    return policy
+
+def load_policy_overrides(path):
+    """Read a JSON policy file mapping extensions to [codec, level] or null"""
+    try:
+        with open(path) as f:
+            overrides = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ValueError(f"Cannot read compression policy {path}: {e}")
+    if not isinstance(overrides, dict):
+        raise ValueError(f"Compression policy {path} must be a JSON object keyed by extension")
+    return overrides
+
+def new_compression_stats():
+    """Per-object compression stats; raw uploads keep these defaults"""
+    return {
+        'compression_codec': 'none',
+        'compression_level': 0,
+        'compressed_size_bytes': 0,
+        'compression_ratio': 1.0,
+        'compress_cpu_sec': 0.0,
+        'decompress_cpu_sec': 0.0,
+        'codec_lookup_sec': 0.0
+    }
+
+class CompressingReader:
+    """Read-only file object yielding ``src`` compressed as it is read
+
+    Clients send it as an upload body of unknown length; ``read(n)`` only
+    returns fewer than ``n`` bytes at the end of the stream, as GridFS and
+    minio's part reader expect. Iterating yields compressed blocks, which
+    requests sends with chunked transfer encoding.
+    """
+
+    def __init__(self, src, codec, level):
+        self.src = src
+        self.codec = codec
+        self._compressor = CODECS[codec]['compressor'](level)
+        self._buffer = bytearray()
+        self._eof = False
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_sec = 0.0
+
+    def _fill(self):
+        block = self.src.read(COPY_BUFFER)
+        # Thread CPU time, so parallel part uploads are not counted
+        cpu_start = time.thread_time()
+        if block:
+            self.bytes_in += len(block)
+            out = self._compressor.compress(block)
+        else:
+            out = self._compressor.flush()
+            self._eof = True
+        self.cpu_sec += time.thread_time() - cpu_start
+        self._buffer += out
+
+    def read(self, size=-1):
+        while not self._eof and (size < 0 or len(self._buffer) < size):
+            self._fill()
+        if size < 0:
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        self.bytes_out += len(data)
+        return data
+
+    def __iter__(self):
+        while True:
+            data = self.read(COPY_BUFFER)
+            if not data:
+                return
+            yield data
+
+class DecompressingWriter:
+    """Write-only file object decoding ``codec`` into ``dst``; None passes bytes through"""
+
+    def __init__(self, dst, codec=None):
+        self.dst = dst
+        self.codec = codec
+        self._decompressor = CODECS[codec]['decompressor']() if codec else None
+        self.cpu_sec = 0.0
+
+    def write(self, data):
+        if self._decompressor is None:
+            return self.dst.write(data)
+        cpu_start = time.thread_time()
+        out = self._decompressor.decompress(data)
+        self.cpu_sec += time.thread_time() - cpu_start
+        return self.dst.write(out)
+
+    def finish(self):
+        """Write whatever the decompressor still buffers"""
+        flush = getattr(self._decompressor, 'flush', None)
+        if flush is not None:
+            self.dst.write(flush())
+
+class StreamEncoder:
+    """Passed to a client's ``upload_file`` to compress the file on the wire
+
+    The client calls ``wrap`` on the open source file and sends the returned
+    reader; ``codec`` is stored with the object so retrieval can decode it.
+    """
+
+    def __init__(self, codec, level):
+        self.codec = codec
+        self.level = level
+        self.reader = None
+
+    def wrap(self, src):
+        self.reader = CompressingReader(src, self.codec, self.level)
+        return self.reader
+
+class StreamDecoder:
+    """Passed to a client's ``retrieve_file`` to decode the stored codec on the fly"""
+
+    def __init__(self):
+        self.writer = None
+        # Set by clients that need a separate request to learn the codec
+        self.lookup_sec = 0.0
+
+    def wrap(self, dst, codec):
+        self.writer = DecompressingWriter(dst, codec)
+        return self.writer
+
+class CompressingClient:
+    """Wrap a storage client with a streaming compression stage
+
+    The codec is chosen from ``policy`` by file extension. Before compressing,
+    the first ``sample_size`` bytes are compressed on their own and the file
+    is sent raw if that sample shrinks by less than ``min_ratio``. Compressed
+    bytes are piped straight into the client's upload and the codec is
+    stored as object metadata, so nothing is staged on local disk and
+    retrieval works from any process. Everything else (durability, dedup
+    stats, ...) is delegated to the wrapped client.
+    """
+
+    def __init__(self, client, policy=None, sample_size=128 * 1024, min_ratio=1.1):
+        self.client = client
+        self.policy = policy if policy is not None else build_policy()
+        self.sample_size = sample_size
+        self.min_ratio = min_ratio
+        self.last_compression_stats = new_compression_stats()
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def get_name(self):
+        return self.client.get_name()
+
+    def _choose_codec(self, file_path):
+        ext = os.path.splitext(file_path)[1].lower()
+        choice = self.policy.get(ext, self.policy.get('*'))
+        if choice is None:
+            return None
+
+        codec, level = choice
+        with open(file_path, 'rb') as f:
+            sample = f.read(self.sample_size)
+        if not sample:
+            return None
+        compressed = CODECS[codec]['compress'](sample, level)
+        if len(sample) / max(len(compressed), 1) < self.min_ratio:
+            return None
+        return choice
+
+    def upload_file(self, file_path, object_name):
+        self.last_compression_stats = new_compression_stats()
+
+        try:
+            choice = self._choose_codec(file_path)
+        except Exception as e:
+            print(f"{self.get_name()} Compression Error: {e}")
+            return False
+        if choice is None:
+            self.last_compression_stats['compressed_size_bytes'] = os.path.getsize(file_path)
+            return self.client.upload_file(file_path, object_name)
+
+        codec, level = choice
+        encoder = StreamEncoder(codec, level)
+        try:
+            success = self.client.upload_file(file_path, object_name, encoder=encoder)
+        except Exception as e:
+            print(f"{self.get_name()} Compression Error: {e}")
+            return False
+
+        reader = encoder.reader
+        # A dedup hit never reads the stream, so there is nothing to report
+        if reader is not None and reader.bytes_out:
+            self.last_compression_stats.update({
+                'compression_codec': codec,
+                'compression_level': level,
+                'compressed_size_bytes': reader.bytes_out,
+                'compression_ratio': reader.bytes_in / reader.bytes_out,
+                'compress_cpu_sec': reader.cpu_sec
+            })
+        return success
+
+    def retrieve_file(self, object_name, download_path):
+        decoder = StreamDecoder()
+        try:
+            success = self.client.retrieve_file(object_name, download_path, decoder=decoder)
+        except Exception as e:
+            print(f"{self.get_name()} Decompression Error: {e}")
+            return False
+
+        if decoder.writer is not None:
+            self.last_compression_stats['decompress_cpu_sec'] = decoder.writer.cpu_sec
+        self.last_compression_stats['codec_lookup_sec'] = decoder.lookup_sec
+        return success
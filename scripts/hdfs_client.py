@@ -1,79 +1,251 @@
 import requests
 import os
 import time
+import uuid
+from requests.adapters import HTTPAdapter
+from utils import lookup_content, new_upload_stats, socket_buffer_options
+
+COPY_BUFFER = 1024 * 1024
+
+class SocketBufferAdapter(HTTPAdapter):
+    """HTTP adapter that sets SO_SNDBUF/SO_RCVBUF on every connection"""
+
+    def __init__(self, socket_buffer, **kwargs):
+        self.socket_buffer = socket_buffer
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['socket_options'] = socket_buffer_options(self.socket_buffer)
+        super().init_poolmanager(*args, **kwargs)
 
 class HDFSClient:
-    def __init__(self):
+    # Replication factor per durability tier. WebHDFS cannot request an
+    # hsync on close, so there is no separate 'journaled' tier. Replication
+    # above the number of live datanodes leaves blocks under-replicated rather
+    # than copied, so such tiers are only offered when enough datanodes run.
+    DURABILITY_LEVELS = {
+        'default': {},
+        'acknowledged': {'replication': 1},
+        'replicated': {'replication': 3},
+    }
+
+    def __init__(self, durability='default', block_size=None, dedup=False,
+                 buffer_size=None, socket_buffer=None):
         self.namenode_url = "http://localhost:9870/webhdfs/v1"
+        self.jmx_url = "http://localhost:9870/jmx"
         self.base_path = "/multimedia"
+        self.block_size = block_size
+        self.buffer_size = buffer_size
+        self.dedup = dedup
+        
+        # One session so connections (and their socket buffers) are reused
+        self.session = requests.Session()
+        if socket_buffer:
+            adapter = SocketBufferAdapter(socket_buffer)
+            self.session.mount("http://", adapter)
+            self.session.mount("https://", adapter)
+        
+        self.last_upload_stats = new_upload_stats()
+        self.set_durability(durability)
         
     def get_name(self):
         return "HDFS"
     
-    def upload_file(self, file_path, object_name):
+    def supported_durability_levels(self):
+        """Durability levels this deployment actually honors"""
+        try:
+            response = self.session.get(self.jmx_url, params={
+                'qry': 'Hadoop:service=NameNode,name=FSNamesystemState'})
+            live_datanodes = response.json()['beans'][0]['NumLiveDataNodes']
+        except Exception as e:
+            print(f"ℹ️ HDFS datanode count unavailable ({e}), assuming all levels")
+            return list(self.DURABILITY_LEVELS)
+        return [level for level, params in self.DURABILITY_LEVELS.items()
+                if params.get('replication', 1) <= live_datanodes]
+    
+    def default_durability_level(self):
+        """Tier the 'default' level is identical to here, or None"""
+        try:
+            defaults_url = f"{self.namenode_url}/?op=GETSERVERDEFAULTS&user.name=root"
+            replication = self.session.get(defaults_url).json()['FsServerDefaults']['replication']
+        except Exception as e:
+            print(f"ℹ️ HDFS server defaults unavailable ({e})")
+            return None
+        for level, params in self.DURABILITY_LEVELS.items():
+            if params.get('replication') == replication:
+                return level
+        return None
+    
+    def set_durability(self, level):
+        """Select the replication factor requested on every CREATE"""
+        self.create_params = dict(self.DURABILITY_LEVELS[level])
+        if self.block_size:
+            self.create_params['blocksize'] = self.block_size
+        if self.buffer_size:
+            self.create_params['buffersize'] = self.buffer_size
+        self.durability = level
+    
+    def _datanode_url(self, response):
+        # Fix: Replace 'datanode:9864' with 'localhost:9864'
+        redirect_url = response.headers['Location']
+        if 'datanode:9864' in redirect_url:
+            redirect_url = redirect_url.replace('datanode:9864', 'localhost:9864')
+        return redirect_url
+    
+    def _create(self, hdfs_path, data, codec=None):
+        """Write ``data`` (bytes, file object or iterable) to ``hdfs_path`` via the two-step CREATE"""
+        # Step 1: Create file and get datanode redirect
+        create_url = f"{self.namenode_url}{hdfs_path}?op=CREATE&overwrite=true&user.name=root"
+        response = self.session.put(create_url, params=self.create_params, allow_redirects=False)
+        
+        if response.status_code not in [307, 308]:
+            return False
+        
+        # Step 2: Upload file data to the datanode (chunked when the length is unknown)
+        upload_response = self.session.put(self._datanode_url(response), data=data,
+                                       headers={'Content-Type': 'application/octet-stream'})
+        if upload_response.status_code != 201:
+            return False
+        return codec is None or self._set_codec(hdfs_path, codec)
+    
+    def _set_codec(self, hdfs_path, codec):
+        """Record the codec of a compressed file as the ``user.codec`` xattr"""
+        xattr_url = f"{self.namenode_url}{hdfs_path}?op=SETXATTR&user.name=root"
+        response = self.session.put(xattr_url, params={'xattr.name': 'user.codec',
+                                                      'xattr.value': codec, 'flag': 'CREATE'})
+        return response.status_code == 200
+    
+    def _get_codec(self, hdfs_path):
+        """Codec recorded for ``hdfs_path``, or None for raw files"""
+        xattr_url = f"{self.namenode_url}{hdfs_path}?op=GETXATTRS&user.name=root"
+        response = self.session.get(xattr_url, params={'xattr.name': 'user.codec', 'encoding': 'text'})
+        if response.status_code != 200:
+            # Files without the xattr answer with a RemoteException
+            return None
+        xattrs = response.json().get('XAttrs', [])
+        # Text-encoded values come back quoted
+        return xattrs[0]['value'].strip('"') if xattrs else None
+    
+    def _open(self, hdfs_path, stream=False):
+        """Read ``hdfs_path`` via the two-step OPEN; returns the bytes (or the
+        streaming response) or None"""
+        # Step 1: Get file and get datanode redirect
+        open_url = f"{self.namenode_url}{hdfs_path}?op=OPEN&user.name=root"
+        open_params = {'buffersize': self.buffer_size} if self.buffer_size else {}
+        response = self.session.get(open_url, params=open_params, allow_redirects=False)
+        
+        if response.status_code not in [307, 308]:
+            return None
+        
+        # Step 2: Download file data from the datanode
+        download_response = self.session.get(self._datanode_url(response), stream=stream)
+        if download_response.status_code != 200:
+            download_response.close()
+            return None
+        return download_response if stream else download_response.content
+    
+    def _exists(self, hdfs_path):
+        status_url = f"{self.namenode_url}{hdfs_path}?op=GETFILESTATUS&user.name=root"
+        return self.session.get(status_url).status_code == 200
+    
+    def _content_path(self, digest, codec=None):
+        # Keyed by durability level and codec, see utils.lookup_content
+        path = f"{self.base_path}/.cas/{self.durability}/{digest}"
+        return f"{path}.{codec}" if codec else path
+    
+    def _write(self, hdfs_path, file_path, encoder=None):
+        with open(file_path, 'rb') as f:
+            if encoder is None:
+                return self._create(hdfs_path, f)
+            return self._create(hdfs_path, encoder.wrap(f), encoder.codec)
+    
+    def _write_content(self, content_path, file_path, encoder=None):
+        """Write content under a temporary name and RENAME it into place
+
+        A failed or interrupted datanode PUT can leave a partial file behind;
+        under the final path it would pass ``_exists`` and turn later uploads
+        into hits on truncated content.
+        """
+        temp_path = f"{content_path}.tmp-{uuid.uuid4().hex}"
+        if self._write(temp_path, file_path, encoder):
+            rename_url = f"{self.namenode_url}{temp_path}?op=RENAME&user.name=root"
+            response = self.session.put(rename_url, params={'destination': content_path})
+            if response.status_code == 200 and response.json().get('boolean'):
+                return True
+        
+        delete_url = f"{self.namenode_url}{temp_path}?op=DELETE&user.name=root"
+        self.session.delete(delete_url)
+        # RENAME refuses to replace a file, e.g. when a concurrent upload of the same content won
+        return self._exists(content_path)
+    
+    def upload_file(self, file_path, object_name, encoder=None):
+        self.last_upload_stats = new_upload_stats()
         try:
             hdfs_path = f"{self.base_path}/{object_name}"
             
-            # Step 1: Create file and get datanode redirect
-            create_url = f"{self.namenode_url}{hdfs_path}?op=CREATE&overwrite=true&user.name=root"
-            response = requests.put(create_url, allow_redirects=False)
+            if not self.dedup:
+                return self._write(hdfs_path, file_path, encoder)
             
-            if response.status_code not in [307, 308]:
+            # Content-addressed mode: skip the transfer if the digest is stored
+            codec = encoder.codec if encoder else None
+            digest, exists = lookup_content(file_path, self.last_upload_stats,
+                                            lambda d: self._exists(self._content_path(d, codec)))
+            content_path = self._content_path(digest, codec)
+            if not exists and not self._write_content(content_path, file_path, encoder):
                 return False
             
-            # Step 2: Extract redirect URL and fix if needed
-            redirect_url = response.headers['Location']
-            
-            # Fix: Replace 'datanode:9864' with 'localhost:9864'
-            if 'datanode:9864' in redirect_url:
-                redirect_url = redirect_url.replace('datanode:9864', 'localhost:9864')
-            
-            # Step 3: Upload file data
-            with open(file_path, 'rb') as f:
-                upload_response = requests.put(redirect_url, data=f, headers={'Content-Type': 'application/octet-stream'})
-            
-            return upload_response.status_code == 201
+            # The object itself is only a pointer holding the content path
+            return self._create(hdfs_path, content_path.encode())
                 
         except Exception as e:
             return False
     
-    def retrieve_file(self, object_name, download_path):
+    def retrieve_file(self, object_name, download_path, decoder=None):
         try:
             hdfs_path = f"{self.base_path}/{object_name}"
             
-            # Step 1: Get file and get datanode redirect
-            open_url = f"{self.namenode_url}{hdfs_path}?op=OPEN&user.name=root"
-            response = requests.get(open_url, allow_redirects=False)
-            
-            if response.status_code not in [307, 308]:
-                return False
-            
-            # Step 2: Extract redirect URL and fix if needed
-            redirect_url = response.headers['Location']
+            if self.dedup:
+                pointer = self._open(hdfs_path)
+                if pointer is None:
+                    return False
+                hdfs_path = pointer.decode()
             
-            # Fix: Replace 'datanode:9864' with 'localhost:9864'
-            if 'datanode:9864' in redirect_url:
-                redirect_url = redirect_url.replace('datanode:9864', 'localhost:9864')
-            
-            # Step 3: Download file data
-            download_response = requests.get(redirect_url)
-            
-            if download_response.status_code == 200:
+            if decoder is None:
+                data = self._open(hdfs_path)
+                if data is None:
+                    return False
+                
                 with open(download_path, 'wb') as f:
-                    f.write(download_response.content)
+                    f.write(data)
                 return True
-            else:
+            
+            # Decode while downloading, using the codec recorded on the file.
+            # MinIO and GridFS return the codec with the object; this extra
+            # NameNode call is reported so it can be kept out of the transfer time.
+            lookup_start = time.time()
+            codec = self._get_codec(hdfs_path)
+            decoder.lookup_sec = time.time() - lookup_start
+            response = self._open(hdfs_path, stream=True)
+            if response is None:
                 return False
+            with response, open(download_path, 'wb') as f:
+                sink = decoder.wrap(f, codec)
+                for chunk in response.iter_content(COPY_BUFFER):
+                    sink.write(chunk)
+                sink.finish()
+            return True
                 
         except Exception as e:
             return False
     
-    def cleanup(self):
+    def cleanup(self, prefix=None):
+        """Delete everything, or only the objects under ``prefix``"""
         try:
-            delete_url = f"{self.namenode_url}{self.base_path}?op=DELETE&recursive=true&user.name=root"
-            response = requests.delete(delete_url)
+            path = f"{self.base_path}/{prefix}" if prefix else self.base_path
+            delete_url = f"{self.namenode_url}{path}?op=DELETE&recursive=true&user.name=root"
+            response = self.session.delete(delete_url)
             if response.status_code == 200:
-                print("✅ HDFS cleaned")
+                print(f"✅ HDFS cleaned{f' ({prefix})' if prefix else ''}")
             else:
                 print(f"ℹ️ HDFS cleanup: {response.status_code}")
         except Exception as e:
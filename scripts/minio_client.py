@@ -1,16 +1,46 @@
+import io
+import urllib3
 from minio import Minio
 from minio.error import S3Error
+from utils import lookup_content, new_upload_stats, socket_buffer_options
+
+COPY_BUFFER = 1024 * 1024
+
+# Part size for uploads of unknown length (minio-py needs one; S3 minimum is 5 MiB)
+STREAM_PART_SIZE = 10 * 1024 * 1024
 
 class MinioClient:
-    def __init__(self):
+    # MinIO always syncs an object to its drives before acknowledging a PUT,
+    # which already meets the 'acknowledged' and 'journaled' tiers, so no
+    # tier needs extra headers. Storage classes only change the erasure
+    # parity of multi-drive sets and give nothing on the single-drive setup.
+    DURABILITY_LEVELS = ('default', 'acknowledged', 'journaled')
+
+    def __init__(self, durability='default', dedup=False, part_size=None, socket_buffer=None):
+        http_client = None
+        if socket_buffer:
+            # Same timeouts and retries as the library's default pool
+            http_client = urllib3.PoolManager(
+                timeout=urllib3.Timeout(connect=300, read=300),
+                maxsize=10,
+                retries=urllib3.Retry(total=5, backoff_factor=0.2,
+                                      status_forcelist=[500, 502, 503, 504]),
+                socket_options=socket_buffer_options(socket_buffer)
+            )
         self.client = Minio(
             "localhost:9000",
             access_key="minioadmin",
             secret_key="minioadmin",
-            secure=False
+            secure=False,
+            http_client=http_client
         )
         self.bucket_name = "multimedia-test"
+        # 0 lets the library pick the multipart part size
+        self.part_size = part_size or 0
+        self.dedup = dedup
+        self.last_upload_stats = new_upload_stats()
         self._ensure_bucket_exists()
+        self.set_durability(durability)
 
     def _ensure_bucket_exists(self):
         if not self.client.bucket_exists(self.bucket_name):
@@ -19,36 +49,123 @@ class MinioClient:
     def get_name(self):
         return "MinIO"
 
-    def upload_file(self, file_path, object_name):
+    def supported_durability_levels(self):
+        """Durability levels this deployment actually honors"""
+        return list(self.DURABILITY_LEVELS)
+
+    def default_durability_level(self):
+        """Tier the 'default' level is identical to here"""
+        return 'journaled'
+
+    def set_durability(self, level):
+        """Record the tier; every PUT is sent the same way"""
+        if level not in self.DURABILITY_LEVELS:
+            raise KeyError(level)
+        self.durability = level
+
+    def _content_name(self, digest, codec=None):
+        # Keyed by durability level and codec, see utils.lookup_content
+        name = f".cas/{self.durability}/{digest}"
+        return f"{name}.{codec}" if codec else name
+
+    def _exists(self, object_name):
         try:
+            self.client.stat_object(self.bucket_name, object_name)
+            return True
+        except S3Error as e:
+            if e.code in ('NoSuchKey', 'NoSuchObject'):
+                return False
+            raise
+
+    def _put(self, object_name, file_path, encoder=None):
+        if encoder is None:
             self.client.fput_object(
-                self.bucket_name, 
-                object_name, 
-                file_path
+                self.bucket_name,
+                object_name,
+                file_path,
+                part_size=self.part_size
+            )
+            return
+
+        # Compressed size is unknown up front, so stream it as multipart
+        with open(file_path, 'rb') as f:
+            self.client.put_object(
+                self.bucket_name,
+                object_name,
+                encoder.wrap(f),
+                length=-1,
+                part_size=self.part_size or STREAM_PART_SIZE,
+                metadata={'codec': encoder.codec}
+            )
+
+    def upload_file(self, file_path, object_name, encoder=None):
+        self.last_upload_stats = new_upload_stats()
+        try:
+            if not self.dedup:
+                self._put(object_name, file_path, encoder)
+                return True
+
+            # Content-addressed mode: skip the transfer if the digest is stored
+            codec = encoder.codec if encoder else None
+            digest, exists = lookup_content(file_path, self.last_upload_stats,
+                                            lambda d: self._exists(self._content_name(d, codec)))
+            content_name = self._content_name(digest, codec)
+            if not exists:
+                self._put(content_name, file_path, encoder)
+
+            # The object itself is an empty pointer naming the content object
+            self.client.put_object(
+                self.bucket_name,
+                object_name,
+                io.BytesIO(b''),
+                0,
+                metadata={'content-name': content_name}
             )
             return True
-        except S3Error as e:
+        except (S3Error, ValueError) as e:
+            # minio-py raises ValueError for invalid part sizes
             print(f"MinIO Upload Error: {e}")
             return False
 
-    def retrieve_file(self, object_name, download_path):
+    def retrieve_file(self, object_name, download_path, decoder=None):
         try:
-            self.client.fget_object(
-                self.bucket_name, 
-                object_name, 
-                download_path
-            )
+            if self.dedup:
+                stat = self.client.stat_object(self.bucket_name, object_name)
+                content_name = stat.metadata.get('x-amz-meta-content-name')
+                if content_name:
+                    object_name = content_name
+
+            if decoder is None:
+                self.client.fget_object(
+                    self.bucket_name, 
+                    object_name, 
+                    download_path
+                )
+                return True
+
+            # Decode while downloading, using the codec stored with the object
+            response = self.client.get_object(self.bucket_name, object_name)
+            try:
+                with open(download_path, 'wb') as f:
+                    sink = decoder.wrap(f, response.headers.get('x-amz-meta-codec'))
+                    for chunk in response.stream(COPY_BUFFER):
+                        sink.write(chunk)
+                    sink.finish()
+            finally:
+                response.close()
+                response.release_conn()
             return True
         except S3Error as e:
             print(f"MinIO Retrieval Error: {e}")
             return False
     
-    def cleanup(self):
-        """Clean up MinIO bucket"""
+    def cleanup(self, prefix=None):
+        """Clean up MinIO bucket, or only the objects under ``prefix``"""
         try:
-            objects = self.client.list_objects(self.bucket_name, recursive=True)
+            objects = self.client.list_objects(self.bucket_name, prefix=f"{prefix}/" if prefix else None,
+                                               recursive=True)
             for obj in objects:
                 self.client.remove_object(self.bucket_name, obj.object_name)
-            print("MinIO cleaned")
+            print(f"MinIO cleaned{f' ({prefix})' if prefix else ''}")
         except Exception as e:
             print(f"MinIO cleanup: {e}")
\ No newline at end of file
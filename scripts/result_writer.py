@@ -0,0 +1,215 @@
+import csv
+import json
+import os
+import time
+
+# Result columns that identify one benchmark cell besides operation and repetition
+DEFAULT_KEY_FIELDS = ("storage_system", "file_category", "file_name")
+
+class ResultWriter:
+    """Stream experiment results to CSV and track completed cells in a manifest.
+
+    Every row is flushed as soon as it is written and both files are fsynced
+    periodically, so a crash or Ctrl-C loses at most the rows since the last
+    sync. The manifest is a JSON-lines file with one entry per completed
+    cell and is used to resume an interrupted run. A cell is identified by
+    the row's ``key_fields`` (backend and file by default) plus the
+    operation and the writer's ``repetition``, stored as ``run`` so it never
+    collides with a key field of the same name.
+
+    The first manifest line records the fieldnames and ``run_config`` (the
+    options that shape the results). Resuming with a different configuration
+    raises ValueError instead of mixing incomparable rows in one CSV.
+    """
+
+    def __init__(self, csv_path, fieldnames, repetition=1, manifest_path=None,
+                 key_fields=DEFAULT_KEY_FIELDS, run_config=None, fsync_every=5, fsync_interval=30.0):
+        self.csv_path = csv_path
+        self.fieldnames = list(fieldnames)
+        self.key_fields = tuple(key_fields)
+        self.repetition = repetition
+        self.manifest_path = manifest_path or default_manifest_path(csv_path)
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        # Compared after a JSON round trip, as it is read back from the manifest
+        self.config = json.loads(json.dumps({'fieldnames': self.fieldnames,
+                                             'options': run_config or {}}))
+
+        self.stored_config = None
+        self.completed = set()
+        self.run_complete = False
+        self.rows_written = 0
+        self._pending = 0
+        self._last_sync = time.time()
+
+        self._load_manifest()
+        self._check_config()
+        self._open_files()
+
+    # ---- manifest handling ----
+
+    def _cell(self, key, operation, repetition=None):
+        # Values are compared as strings since they round-trip through CSV/JSON
+        values = tuple(str(key[field]) for field in self.key_fields)
+        return values + (operation, self.repetition if repetition is None else repetition)
+
+    def _load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return
+        with open(self.manifest_path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Partial trailing line from an interrupted write
+                    continue
+                if entry.get('operation') == 'config':
+                    self.stored_config = {'fieldnames': entry['fieldnames'],
+                                          'options': entry['options']}
+                    continue
+                if entry.get('operation') == 'run':
+                    self.run_complete = True
+                    continue
+                missing = [field for field in self.key_fields + ('operation', 'run') if field not in entry]
+                if missing:
+                    raise ValueError(f"{self.manifest_path} has an entry without {missing}; "
+                                     f"it was written by an older or different run")
+                self.completed.add(self._cell(entry, entry['operation'], entry['run']))
+
+    def _check_config(self):
+        """Refuse to resume a manifest written with a different configuration"""
+        if self.stored_config is None:
+            if self.completed or self.run_complete:
+                raise ValueError(f"{self.manifest_path} does not record its run configuration")
+            return
+        if self.stored_config == self.config:
+            return
+        changed = [name for name in set(self.config['options']) | set(self.stored_config['options'])
+                   if self.config['options'].get(name) != self.stored_config['options'].get(name)]
+        if self.config['fieldnames'] != self.stored_config['fieldnames']:
+            changed.append('fieldnames')
+        raise ValueError(f"{self.manifest_path} was written with a different configuration "
+                         f"(changed: {', '.join(sorted(changed))})")
+
+    def _truncate_torn_line(self, path):
+        """Drop a partial last line left behind by an interrupted write"""
+        with open(path, 'rb+') as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+
+    def _repair_csv(self):
+        """Register rows that reached the CSV but not the manifest"""
+        missing = []
+        with open(self.csv_path, newline='') as f:
+            for row in csv.DictReader(f):
+                if self._cell(row, 'retrieve') not in self.completed:
+                    missing.append(row)
+        return missing
+
+    def _open_files(self):
+        if os.path.exists(self.csv_path):
+            self._truncate_torn_line(self.csv_path)
+        resume = os.path.exists(self.csv_path) and os.path.getsize(self.csv_path) > 0
+        missing = self._repair_csv() if resume else []
+
+        self._csv_file = open(self.csv_path, 'a', newline='')
+        self._writer = csv.DictWriter(self._csv_file, fieldnames=self.fieldnames)
+        if not resume:
+            self._writer.writeheader()
+        if os.path.exists(self.manifest_path):
+            self._truncate_torn_line(self.manifest_path)
+        self._manifest_file = open(self.manifest_path, 'a')
+        if self.stored_config is None:
+            self._manifest_file.write(json.dumps({'operation': 'config', **self.config}) + "\n")
+
+        # A row reached the CSV but the process died before its manifest entry
+        for row in missing:
+            self.mark_done(row, 'retrieve')
+        self.sync()
+
+    # ---- public API ----
+
+    def is_done(self, key, operation='retrieve'):
+        """Return True if the cell identified by ``key`` (a dict) is recorded"""
+        return self._cell(key, operation) in self.completed
+
+    def mark_done(self, key, operation):
+        """Record a completed cell in the manifest"""
+        entry = {
+            'operation': operation,
+            'run': self.repetition,
+            'timestamp': time.strftime("%Y-%m-%d %H:%M:%S")
+        }
+        entry.update({field: str(key[field]) for field in self.key_fields})
+        self._manifest_file.write(json.dumps(entry) + "\n")
+        self._manifest_file.flush()
+        self.completed.add(self._cell(key, operation))
+
+    def write(self, result):
+        """Append one result row and mark its retrieve cell as done"""
+        self._writer.writerow(result)
+        self._csv_file.flush()
+        self.rows_written += 1
+        self._pending += 1
+        self.mark_done(result, 'retrieve')
+
+        if self._pending >= self.fsync_every or time.time() - self._last_sync >= self.fsync_interval:
+            self.sync()
+
+    def sync(self):
+        """Force buffered rows and manifest entries to disk (CSV first)"""
+        for f in (self._csv_file, self._manifest_file):
+            f.flush()
+            os.fsync(f.fileno())
+        self._pending = 0
+        self._last_sync = time.time()
+
+    def finish(self):
+        """Mark the whole run as complete so a resumed suite skips it"""
+        self._manifest_file.write(json.dumps({'operation': 'run', 'run': self.repetition}) + "\n")
+        self.run_complete = True
+        self.close()
+
+    def close(self):
+        if self._csv_file.closed:
+            return
+        self.sync()
+        self._csv_file.close()
+        self._manifest_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def default_manifest_path(csv_path):
+    """Manifest path used next to ``csv_path`` when none is given"""
+    return os.path.splitext(csv_path)[0] + ".manifest.jsonl"
+
+def discard_unless_resumable(csv_path, manifest_path=None):
+    """Delete the CSV and manifest unless they hold an unfinished run
+
+    Only a manifest from an unfinished run is resumed; a finished run or a
+    CSV written without a manifest is replaced. Returns the manifest path.
+    """
+    manifest_path = manifest_path or default_manifest_path(csv_path)
+    if run_completed(manifest_path) or not os.path.exists(manifest_path):
+        for path in (csv_path, manifest_path):
+            if os.path.exists(path):
+                os.remove(path)
+    return manifest_path
+
+def run_completed(manifest_path):
+    """Return True if the manifest records a finished run"""
+    if not os.path.exists(manifest_path):
+        return False
+    with open(manifest_path) as f:
+        for line in f:
+            try:
+                if json.loads(line).get('operation') == 'run':
+                    return True
+            except ValueError:
+                continue
+    return False
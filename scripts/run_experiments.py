@@ -1,10 +1,31 @@
+import argparse
 import time
 import csv
 import os
 from hdfs_client import HDFSClient
 from minio_client import MinioClient
 from mongodb_client import MongoDBClient
-from utils import get_system_stats, format_file_size
+from compression import CODECS, CompressingClient, build_policy, load_policy_overrides, new_compression_stats
+from result_writer import ResultWriter, discard_unless_resumable
+from utils import get_system_stats, format_file_size, DURABILITY_TIERS
+
+# Columns identifying one cell in the resume manifest
+CELL_FIELDS = ("storage_system", "durability_level", "file_category", "file_name")
+
+# Fixed column order so rows can be streamed before the run finishes. Speeds
+# are original bytes over end-to-end time, so with compression they are the
+# effective MB/s including codec time. Metadata requests a backend needs only
+# to find the codec are recorded in codec_lookup_sec and left out of the
+# retrieval time.
+RESULT_FIELDS = [
+    "storage_system", "durability_level", "file_category", "file_name", "file_size_bytes", "file_type",
+    "upload_time_sec", "upload_speed_mb_sec", "retrieval_time_sec", "retrieval_speed_mb_sec",
+    "upload_success", "retrieval_success", "download_verified",
+    "dedup_hit", "bytes_saved", "hash_time_sec", "lookup_time_sec",
+    "compression_codec", "compression_level", "compressed_size_bytes", "compression_ratio",
+    "compress_cpu_sec", "decompress_cpu_sec", "codec_lookup_sec",
+    "cpu_usage", "memory_usage", "timestamp"
+]
 
 def scan_datasets_folder():
     """Scan the datasets folder and return all files with their categories"""
@@ -28,16 +49,136 @@ def scan_datasets_folder():
     
     return files_by_category
 
-def run_comprehensive_experiments():
-    """Run comprehensive tests across all storage systems and file categories"""
+def run_single_test(system, writer, category, file_info):
+    """Upload and retrieve one file on one system at its current durability level"""
+    file_path = file_info['path']
+    file_name = file_info['name']
+    file_size = file_info['size']
+    system_name = system.get_name()
+    level = system.durability
+    
+    # Keep each level's copy separate so retrievals read what that level wrote
+    object_name = f"{category}/{file_name}" if level == 'default' else f"{level}/{category}/{file_name}"
+    cell = {
+        "storage_system": system_name,
+        "durability_level": level,
+        "file_category": category,
+        "file_name": file_name
+    }
+    
+    if writer.is_done(cell):
+        print(f"\nSkipping {system_name} [{level}] | {category} | {file_name} (already recorded)")
+        return
+    
+    print(f"\nTesting {system_name} [{level}] | {category} | {file_name} ({format_file_size(file_size)})")
+    
+    # 1. UPLOAD TEST
+    upload_start = time.time()
+    upload_success = system.upload_file(file_path, object_name)
+    upload_time = time.time() - upload_start
+    upload_stats = system.last_upload_stats
+    writer.mark_done(cell, 'upload')
+    upload_speed = file_size / upload_time / (1024**2) if upload_time > 0 else 0
+    
+    # Brief pause between operations
+    time.sleep(2)
+    
+    # 2. RETRIEVAL TEST  
+    download_path = f"../temp_downloads/{system_name}_{level}_{category}_{file_name}"  # FIXED PATH
+    retrieval_start = time.time()
+    retrieval_success = system.retrieve_file(object_name, download_path)
+    retrieval_time = time.time() - retrieval_start
+    compression_stats = getattr(system, 'last_compression_stats', None) or new_compression_stats()
+    retrieval_time -= compression_stats['codec_lookup_sec']
+    retrieval_speed = file_size / retrieval_time / (1024**2) if retrieval_time > 0 else 0
+    
+    # 3. VERIFY INTEGRITY
+    download_verified = False
+    if retrieval_success and os.path.exists(download_path):
+        download_size = os.path.getsize(download_path)
+        download_verified = (download_size == file_size)
+    
+    # 4. RECORD RESULTS
+    system_stats = get_system_stats()
+    result = {
+        "storage_system": system_name,
+        "durability_level": level,
+        "file_category": category,
+        "file_name": file_name,
+        "file_size_bytes": file_size,
+        "file_type": os.path.splitext(file_name)[1].lower(),
+        "upload_time_sec": round(upload_time, 4),
+        "upload_speed_mb_sec": round(upload_speed, 4),
+        "retrieval_time_sec": round(retrieval_time, 4),
+        "retrieval_speed_mb_sec": round(retrieval_speed, 4),
+        "upload_success": upload_success,
+        "retrieval_success": retrieval_success,
+        "download_verified": download_verified,
+        "dedup_hit": upload_stats['dedup_hit'],
+        "bytes_saved": upload_stats['bytes_saved'],
+        "hash_time_sec": round(upload_stats['hash_time_sec'], 4),
+        "lookup_time_sec": round(upload_stats['lookup_time_sec'], 4),
+        "compression_codec": compression_stats['compression_codec'],
+        "compression_level": compression_stats['compression_level'],
+        "compressed_size_bytes": compression_stats['compressed_size_bytes'] or file_size,
+        "compression_ratio": round(compression_stats['compression_ratio'], 4),
+        "compress_cpu_sec": round(compression_stats['compress_cpu_sec'], 4),
+        "decompress_cpu_sec": round(compression_stats['decompress_cpu_sec'], 4),
+        "codec_lookup_sec": round(compression_stats['codec_lookup_sec'], 4),
+        "cpu_usage": system_stats['cpu_percent'],
+        "memory_usage": system_stats['memory_percent'],
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
+    }
+    writer.write(result)
+    
+    # Cleanup downloaded file
+    if os.path.exists(download_path):
+        os.remove(download_path)
+    
+    print(f"  Upload: {upload_time:.2f}s ({upload_speed:.2f} MB/s) | "
+          f"Retrieval: {retrieval_time:.2f}s ({retrieval_speed:.2f} MB/s) | "
+          f"Success: {upload_success & retrieval_success}")
+
+def run_comprehensive_experiments(writer, durability_levels=('default',), hdfs_block_size=None,
+                                  dedup=False, compression_policy=None):
+    """Run comprehensive tests across all storage systems and file categories
+
+    Every file is tested on each system at each of ``durability_levels``
+    that the system's deployment actually honors, so backends are compared
+    at equal write guarantees. Each result is handed to ``writer`` as soon as it is
+    measured. Cells the writer's manifest already records as done are
+    skipped, so calling this again after an interruption resumes the run.
+    With ``dedup`` the clients store content by digest and skip transfers
+    of content they already hold. A ``compression_policy`` (see
+    ``compression.build_policy``) puts a codec stage in front of every client.
+    """
     
     # Initialize storage clients
-    hdfs = HDFSClient()
-    minio = MinioClient()
-    mongo = MongoDBClient()
+    hdfs = HDFSClient(block_size=hdfs_block_size, dedup=dedup)
+    minio = MinioClient(dedup=dedup)
+    mongo = MongoDBClient(dedup=dedup)
     
     systems = [hdfs, minio, mongo]
-    results = []
+    if compression_policy is not None:
+        systems = [CompressingClient(system, compression_policy) for system in systems]
+    
+    # Levels a deployment cannot honor, and a 'default' identical to another
+    # requested level, would only produce duplicate numbers under a
+    # misleading label
+    levels_by_system = {}
+    for system in systems:
+        supported = system.supported_durability_levels()
+        levels = [level for level in durability_levels if level in supported]
+        unsupported = [level for level in durability_levels if level not in supported]
+        if unsupported:
+            print(f"WARNING: {system.get_name()} cannot honor durability levels {unsupported} "
+                  f"on this deployment, skipping those")
+        same_as_default = system.default_durability_level()
+        if 'default' in levels and same_as_default in levels:
+            levels.remove('default')
+            print(f"{system.get_name()}: 'default' is identical to '{same_as_default}' "
+                  f"on this deployment, recording it only as '{same_as_default}'")
+        levels_by_system[system.get_name()] = levels
     
     # Scan for available files
     dataset_files = scan_datasets_folder()
@@ -46,6 +187,7 @@ def run_comprehensive_experiments():
     print("Found files:")
     for category, files in dataset_files.items():
         print(f"  {category}: {len(files)} files")
+    print(f"Durability levels: {', '.join(durability_levels)}")
     
     # Run tests for each category
     for category, files in dataset_files.items():
@@ -57,81 +199,38 @@ def run_comprehensive_experiments():
         test_files = files[:min(3, len(files))]
         
         for file_info in test_files:
-            file_path = file_info['path']
-            file_name = file_info['name']
-            file_size = file_info['size']
-            
             for system in systems:
-                system_name = system.get_name()
-                
-                print(f"\nTesting {system_name} | {category} | {file_name} ({format_file_size(file_size)})")
-                
-                # 1. UPLOAD TEST
-                upload_start = time.time()
-                upload_success = system.upload_file(file_path, f"{category}/{file_name}")
-                upload_time = time.time() - upload_start
-                upload_speed = file_size / upload_time / (1024**2) if upload_time > 0 else 0
-                
-                # Brief pause between operations
-                time.sleep(2)
-                
-                # 2. RETRIEVAL TEST  
-                download_path = f"../temp_downloads/{system_name}_{category}_{file_name}"  # FIXED PATH
-                retrieval_start = time.time()
-                retrieval_success = system.retrieve_file(f"{category}/{file_name}", download_path)
-                retrieval_time = time.time() - retrieval_start
-                retrieval_speed = file_size / retrieval_time / (1024**2) if retrieval_time > 0 else 0
-                
-                # 3. VERIFY INTEGRITY
-                download_verified = False
-                if retrieval_success and os.path.exists(download_path):
-                    download_size = os.path.getsize(download_path)
-                    download_verified = (download_size == file_size)
-                
-                # 4. RECORD RESULTS
-                system_stats = get_system_stats()
-                result = {
-                    "storage_system": system_name,
-                    "file_category": category,
-                    "file_name": file_name,
-                    "file_size_bytes": file_size,
-                    "file_type": os.path.splitext(file_name)[1].lower(),
-                    "upload_time_sec": round(upload_time, 4),
-                    "upload_speed_mb_sec": round(upload_speed, 4),
-                    "retrieval_time_sec": round(retrieval_time, 4),
-                    "retrieval_speed_mb_sec": round(retrieval_speed, 4),
-                    "upload_success": upload_success,
-                    "retrieval_success": retrieval_success,
-                    "download_verified": download_verified,
-                    "cpu_usage": system_stats['cpu_percent'],
-                    "memory_usage": system_stats['memory_percent'],
-                    "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
-                }
-                results.append(result)
-                
-                # Cleanup downloaded file
-                if os.path.exists(download_path):
-                    os.remove(download_path)
-                
-                print(f"  Upload: {upload_time:.2f}s ({upload_speed:.2f} MB/s) | "
-                      f"Retrieval: {retrieval_time:.2f}s ({retrieval_speed:.2f} MB/s) | "
-                      f"Success: {upload_success & retrieval_success}")
+                for level in levels_by_system[system.get_name()]:
+                    system.set_durability(level)
+                    run_single_test(system, writer, category, file_info)
     
+    return writer.rows_written
+
+def load_results(csv_path):
+    """Read a streamed results CSV back into typed dicts"""
+    numeric = ("file_size_bytes", "upload_time_sec", "upload_speed_mb_sec",
+               "retrieval_time_sec", "retrieval_speed_mb_sec", "bytes_saved",
+               "hash_time_sec", "lookup_time_sec", "compressed_size_bytes", "compression_ratio",
+               "compress_cpu_sec", "decompress_cpu_sec", "codec_lookup_sec", "cpu_usage", "memory_usage")
+    flags = ("upload_success", "retrieval_success", "download_verified", "dedup_hit")
+    
+    results = []
+    with open(csv_path, newline='') as f:
+        for row in csv.DictReader(f):
+            for key in numeric:
+                row[key] = float(row[key])
+            for key in flags:
+                row[key] = row[key] == "True"
+            results.append(row)
     return results
 
-def save_and_analyze_results(results):
-    """Save results to CSV and provide summary"""
+def save_and_analyze_results(csv_path):
+    """Summarize the results streamed to ``csv_path``"""
+    results = load_results(csv_path) if os.path.exists(csv_path) else []
     if not results:
         print("No results to save!")
         return
     
-    # Save to CSV
-    csv_path = "../results/experiment_results.csv"
-    with open(csv_path, 'w', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=results[0].keys())
-        writer.writeheader()
-        writer.writerows(results)
-    
     print(f"\n=== Results Summary ===")
     print(f"Results saved to: {csv_path}")
     print(f"Total test runs: {len(results)}")
@@ -146,6 +245,44 @@ def save_and_analyze_results(results):
         print(f"  Success rate: {mean([1 if r['upload_success'] and r['retrieval_success'] else 0 for r in system_results])*100:.1f}%")
         print(f"  Avg upload speed: {mean([r['upload_speed_mb_sec'] for r in system_results]):.2f} MB/s")
         print(f"  Avg retrieval speed: {mean([r['retrieval_speed_mb_sec'] for r in system_results]):.2f} MB/s")
+        
+        hashed = [r for r in system_results if r['hash_time_sec'] > 0]
+        if hashed:
+            hits = sum(1 for r in hashed if r['dedup_hit'])
+            print(f"  Dedup hits: {hits}/{len(hashed)} | "
+                  f"Bytes saved: {format_file_size(sum(r['bytes_saved'] for r in hashed))}")
+            print(f"  Avg hash time: {mean([r['hash_time_sec'] for r in hashed]):.4f}s | "
+                  f"Avg lookup time: {mean([r['lookup_time_sec'] for r in hashed]):.4f}s")
+    
+    # Summary by durability level, so systems are compared at equal guarantees
+    levels = sorted(set(r['durability_level'] for r in results))
+    if len(levels) > 1:
+        print(f"\nPerformance by durability level:")
+        for level in levels:
+            print(f"  {level}:")
+            for system in sorted(systems):
+                level_results = [r for r in results
+                                 if r['storage_system'] == system and r['durability_level'] == level]
+                if not level_results:
+                    continue
+                total_mb = sum(r['file_size_bytes'] for r in level_results) / (1024**2)
+                upload_secs = sum(r['upload_time_sec'] for r in level_results)
+                print(f"    {system:8} | upload {mean([r['upload_time_sec'] for r in level_results]):.3f}s avg, "
+                      f"{total_mb / upload_secs if upload_secs > 0 else 0:.2f} MB/s | "
+                      f"retrieval {mean([r['retrieval_time_sec'] for r in level_results]):.3f}s avg")
+    
+    # Summary by file type where a codec was applied
+    compressed = [r for r in results if r['compression_codec'] != 'none']
+    if compressed:
+        print(f"\nCompression by file type:")
+        for system, file_type in sorted(set((r['storage_system'], r['file_type']) for r in compressed)):
+            type_results = [r for r in compressed
+                            if r['storage_system'] == system and r['file_type'] == file_type]
+            print(f"  {system:8} {file_type:6} | ratio {mean([r['compression_ratio'] for r in type_results]):.2f}x | "
+                  f"codec CPU {mean([r['compress_cpu_sec'] for r in type_results]):.3f}s / "
+                  f"{mean([r['decompress_cpu_sec'] for r in type_results]):.3f}s | "
+                  f"effective {mean([r['upload_speed_mb_sec'] for r in type_results]):.2f} / "
+                  f"{mean([r['retrieval_speed_mb_sec'] for r in type_results]):.2f} MB/s")
     
     # Summary by file category
     categories = set(r['file_category'] for r in results)
@@ -159,8 +296,17 @@ def mean(values):
     """Calculate mean of a list"""
     return sum(values) / len(values) if values else 0
 
-def main():
-    """Main execution function"""
+def main(csv_path="../results/experiment_results.csv", repetition=1,
+         durability_levels=('default',), hdfs_block_size=None, dedup=False,
+         compression_policy=None):
+    """Main execution function
+
+    Results stream to ``csv_path`` with a ``.manifest.jsonl`` next to it.
+    If both already exist from an interrupted run, the run resumes from the
+    first cell that was not completed, provided it was started with the same
+    options. Returns True once the run is complete and False if it could not
+    run, including when the interrupted run used different options.
+    """
     # Create necessary directories
     os.makedirs("../temp_downloads", exist_ok=True)
     os.makedirs("../results", exist_ok=True)
@@ -169,13 +315,77 @@ def main():
     if not os.path.exists("../datasets"):
         print("ERROR: 'datasets' folder not found!")
         print("Please create 'datasets' folder in the project root with 'small/', 'medium/', 'large/' subfolders")
-        return
+        return False
+    
+    # A finished run is started over; an interrupted one resumes
+    manifest_path = discard_unless_resumable(csv_path)
+    
+    # Options that change what the rows mean; a resume must use the same ones
+    run_config = {
+        'durability_levels': list(durability_levels),
+        'hdfs_block_size': hdfs_block_size,
+        'dedup': dedup,
+        'compression_policy': compression_policy
+    }
+    try:
+        writer = ResultWriter(csv_path, RESULT_FIELDS, repetition=repetition,
+                              manifest_path=manifest_path, key_fields=CELL_FIELDS,
+                              run_config=run_config)
+    except ValueError as e:
+        print(f"ERROR: refusing to resume {csv_path}: {e}")
+        print("Re-run with the original options, or start fresh (run_multiple_tests.py --fresh, "
+              "or delete the CSV and its manifest)")
+        return False
     
-    # Run experiments
-    results = run_comprehensive_experiments()
+    # Run experiments, streaming each result to disk
+    with writer:
+        if writer.completed:
+            print(f"Resuming run {repetition}: {len(writer.completed)} cells already recorded")
+        run_comprehensive_experiments(writer, durability_levels, hdfs_block_size, dedup,
+                                      compression_policy)
+        writer.finish()
     
-    # Save and analyze results
-    save_and_analyze_results(results)
+    # Analyze results
+    save_and_analyze_results(csv_path)
+    return True
+
+def add_run_arguments(parser):
+    """Add the benchmark options shared by the runner scripts"""
+    parser.add_argument("--durability", nargs='+', default=['default'], choices=DURABILITY_TIERS,
+                        help="durability levels to benchmark each write at")
+    parser.add_argument("--hdfs-block-size", type=int,
+                        help="HDFS block size in bytes requested on each CREATE")
+    parser.add_argument("--dedup", action="store_true",
+                        help="store content by SHA-256 digest and skip uploads of known content")
+    parser.add_argument("--compress", action="store_true",
+                        help="compress uploads per file type, skipping incompressible content")
+    parser.add_argument("--codec", choices=list(CODECS),
+                        help="codec for compressible types (default: zstd if installed, else gzip; "
+                             "implies --compress)")
+    parser.add_argument("--compression-level", type=int,
+                        help="codec level (default: the codec's own default; implies --compress)")
+    parser.add_argument("--compression-policy", metavar="PATH",
+                        help="JSON file mapping extensions to [codec, level] or null, "
+                             "merged over the defaults (implies --compress)")
+
+def compression_policy_from_args(args):
+    """Build the compression policy requested on the command line, if any"""
+    # Any codec option asks for compression, rather than being silently dropped
+    if not (args.compress or args.compression_policy or args.codec
+            or args.compression_level is not None):
+        return None
+    overrides = load_policy_overrides(args.compression_policy) if args.compression_policy else None
+    return build_policy(args.codec, args.compression_level, overrides)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run the multimedia storage benchmark once")
+    add_run_arguments(parser)
+    args = parser.parse_args()
+    
+    try:
+        compression_policy = compression_policy_from_args(args)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    main(durability_levels=args.durability, hdfs_block_size=args.hdfs_block_size, dedup=args.dedup,
+         compression_policy=compression_policy)
\ No newline at end of file
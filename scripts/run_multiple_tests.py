@@ -1,44 +1,55 @@
+import argparse
 import os
 import time
-import shutil
+from result_writer import run_completed
+from run_experiments import add_run_arguments, compression_policy_from_args
 
-def run_multiple_simple(num_runs=5):
-    """Run experiments multiple times for statistical significance"""
+def run_multiple_simple(num_runs=5, resume=True, durability_levels=('default',), hdfs_block_size=None,
+                        dedup=False, compression_policy=None):
+    """Run experiments multiple times for statistical significance
+
+    Each run streams straight into ``run{i}.csv`` with a manifest next to it.
+    With ``resume`` (the default) finished runs are skipped and an interrupted
+    run continues from its last completed cell; otherwise all run files are
+    removed and the suite starts over. With ``dedup`` storage is only
+    cleaned before the first run, so later runs re-upload known content.
+    """
     
     print(f"🎯 Starting {num_runs} experiment runs for statistical significance")
     print(f"📊 Expected total data points: {num_runs * 24}")
     
     # Clean up any existing run files
-    for i in range(1, num_runs + 1):
-        run_file = f"../results/run{i}.csv"
-        if os.path.exists(run_file):
-            os.remove(run_file)
-            print(f"🧹 Removed existing: run{i}.csv")
+    if not resume:
+        for i in range(1, num_runs + 1):
+            for run_file in (f"../results/run{i}.csv", f"../results/run{i}.manifest.jsonl"):
+                if os.path.exists(run_file):
+                    os.remove(run_file)
+                    print(f"🧹 Removed existing: {os.path.basename(run_file)}")
     
     for i in range(1, num_runs + 1):
+        target_file = f"../results/run{i}.csv"
+        manifest_file = f"../results/run{i}.manifest.jsonl"
+        
+        if run_completed(manifest_file):
+            print(f"\n⏭️  RUN {i}/{num_runs} already complete, skipping")
+            continue
+        
         print(f"\n🚀 STARTING RUN {i}/{num_runs}")
         print("=" * 50)
         
         # Import and run cleanup
         from cleanup_storage import cleanup_all
-        cleanup_all()
+        if not dedup or i == 1:
+            cleanup_all()
         
         # Import and run experiments
         from run_experiments import main
         print("🔬 Running experiments...")
-        main()  # This will run the experiments
+        completed = main(csv_path=target_file, repetition=i,
+                         durability_levels=durability_levels, hdfs_block_size=hdfs_block_size,
+                         dedup=dedup, compression_policy=compression_policy)
         
-        # Rename results - with better error handling
-        source_file = "../results/experiment_results.csv"
-        target_file = f"../results/run{i}.csv"
-        
-        if os.path.exists(source_file):
-            # Remove target if it exists
-            if os.path.exists(target_file):
-                os.remove(target_file)
-            
-            # Rename the file
-            os.rename(source_file, target_file)
+        if completed and os.path.exists(target_file):
             print(f"✅ Results saved: run{i}.csv")
             
             # Show how many data points got
@@ -57,6 +68,10 @@ def run_multiple_simple(num_runs=5):
                 print(f"⚡ Avg upload: {avg_upload:.1f} MB/s, download: {avg_download:.1f} MB/s")
             except Exception as e:
                 print(f"📊 Could not read CSV file: {e}")
+        elif not completed:
+            # Mismatched resume or missing datasets; later runs would fail the same way
+            print(f"❌ Run {i} could not start, stopping the suite")
+            break
         else:
             print("❌ No results file generated!")
         
@@ -65,8 +80,24 @@ def run_multiple_simple(num_runs=5):
             print("⏳ Waiting 10 seconds before next run...")
             time.sleep(10)
     
-    print(f"\n🎉 ALL {num_runs} RUNS COMPLETED!")
-    print(f"📈 Total data points: ~{num_runs * 24}")
+    else:
+        print(f"\n🎉 ALL {num_runs} RUNS COMPLETED!")
+        print(f"📈 Total data points: ~{num_runs * 24}")
 
 if __name__ == "__main__":
-    run_multiple_simple(5)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run the benchmark several times")
+    parser.add_argument("--runs", type=int, default=5, help="number of runs")
+    parser.add_argument("--fresh", action="store_true",
+                        help="discard existing run files instead of resuming")
+    add_run_arguments(parser)
+    args = parser.parse_args()
+    
+    # Reject a bad codec setup before any storage is cleaned
+    try:
+        compression_policy = compression_policy_from_args(args)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    run_multiple_simple(args.runs, resume=not args.fresh,
+                        durability_levels=args.durability, hdfs_block_size=args.hdfs_block_size,
+                        dedup=args.dedup, compression_policy=compression_policy)
\ No newline at end of file
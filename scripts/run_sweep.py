@@ -0,0 +1,382 @@
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import sys
+import time
+import pandas as pd
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import seaborn as sns
+from hdfs_client import HDFSClient
+from minio_client import MinioClient
+from mongodb_client import MongoDBClient
+from result_writer import ResultWriter, discard_unless_resumable
+from run_experiments import scan_datasets_folder
+from utils import format_file_size
+
+# YAML is optional; JSON configs work without it
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+# Client class and the constructor knobs a sweep may vary, in heatmap axis order
+BACKENDS = {
+    'HDFS': (HDFSClient, ['buffer_size', 'block_size', 'socket_buffer']),
+    'MinIO': (MinioClient, ['part_size', 'socket_buffer']),
+    'MongoDB': (MongoDBClient, ['chunk_size_bytes']),
+}
+
+PARAM_FIELDS = sorted(set(param for _, params in BACKENDS.values() for param in params))
+
+SWEEP_FIELDS = ["storage_system", "config_id"] + PARAM_FIELDS + [
+    "size_class", "file_name", "file_size_bytes", "repetition",
+    "upload_time_sec", "upload_speed_mb_sec", "retrieval_time_sec", "retrieval_speed_mb_sec",
+    "upload_success", "retrieval_success", "download_verified", "timestamp"
+]
+
+CELL_FIELDS = ("storage_system", "config_id", "size_class", "file_name", "repetition")
+
+OPERATIONS = {
+    'upload': 'upload_speed_mb_sec',
+    'retrieval': 'retrieval_speed_mb_sec',
+}
+
+SIZE_UNITS = {'B': 1, 'KB': 1024, 'MB': 1024**2, 'GB': 1024**3}
+
+# (minimum, exclusive maximum, required multiple) accepted by each backend
+PARAM_LIMITS = {
+    ('HDFS', 'buffer_size'): (1, None, 1),
+    # dfs.namenode.fs-limits.min-block-size and the 512-byte checksum chunk
+    ('HDFS', 'block_size'): (1024**2, None, 512),
+    ('HDFS', 'socket_buffer'): (1, None, 1),
+    # S3 multipart parts are 5 MiB to 5 GiB
+    ('MinIO', 'part_size'): (5 * 1024**2, 5 * 1024**3 + 1, 1),
+    ('MinIO', 'socket_buffer'): (1, None, 1),
+    # GridFS chunks are single BSON documents, capped at 16 MiB
+    ('MongoDB', 'chunk_size_bytes'): (1, 16 * 1024**2, 1),
+}
+
+def check_param_values(backend, name, values):
+    """Raise ValueError for knob values the backend would reject mid-sweep"""
+    low, high, multiple = PARAM_LIMITS[(backend, name)]
+    for value in values if isinstance(values, list) else [values]:
+        if value is None:
+            continue
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise ValueError(f"{backend} {name} must be an integer byte count or null, got {value!r}")
+        if value < low or (high is not None and value >= high) or value % multiple:
+            limits = f">= {low}" + (f" and < {high}" if high is not None else "")
+            if multiple > 1:
+                limits += f" and a multiple of {multiple}"
+            raise ValueError(f"{backend} {name}={value} is invalid; it must be {limits}")
+
+def load_sweep_config(path):
+    """Read a sweep matrix from a .json or .yaml/.yml file"""
+    with open(path) as f:
+        if path.endswith('.json'):
+            config = json.load(f)
+        elif yaml is None:
+            raise ValueError("PyYAML is not installed; use a .json config or pip install pyyaml")
+        else:
+            config = yaml.safe_load(f)
+
+    for backend, params in config.get('backends', {}).items():
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}', expected one of {list(BACKENDS)}")
+        unknown = set(params or {}) - set(BACKENDS[backend][1])
+        if unknown:
+            raise ValueError(f"{backend} has no tunable parameters {sorted(unknown)}; "
+                             f"supported: {BACKENDS[backend][1]}")
+        for name, values in (params or {}).items():
+            check_param_values(backend, name, values)
+    return config
+
+def expand_grid(params):
+    """Cartesian product of a {name: [values]} dict as a list of {name: value}"""
+    params = params or {}
+    names = sorted(params)
+    values = [v if isinstance(v, list) else [v] for v in (params[name] for name in names)]
+    return [dict(zip(names, combo)) for combo in itertools.product(*values)]
+
+def config_id(params):
+    """Stable, readable identifier for one parameter combination"""
+    return ",".join(f"{name}={'default' if value is None else value}"
+                    for name, value in sorted(params.items())) or "defaults"
+
+def parse_size(value):
+    """Turn 1048576, '1MB' or '512 KB' into a byte count"""
+    if isinstance(value, int):
+        return value
+    text = str(value).strip().upper().replace(' ', '')
+    for unit in sorted(SIZE_UNITS, key=len, reverse=True):
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * SIZE_UNITS[unit])
+    return int(text)
+
+def resolve_size_classes(config, input_dir):
+    """Map each size class to its test files
+
+    Dataset categories ('small', 'medium', 'large') use the first
+    ``files_per_size`` files of that folder; explicit sizes get a
+    generated file of random bytes.
+    """
+    files_per_size = config.get('files_per_size', 2)
+    datasets = scan_datasets_folder()
+    size_classes = {}
+
+    for entry in config.get('object_sizes', ['small', 'medium', 'large']):
+        if entry in datasets:
+            size_classes[entry] = datasets[entry][:files_per_size]
+            continue
+
+        size = parse_size(entry)
+        path = os.path.join(input_dir, f"sweep_{size}.bin")
+        if not os.path.exists(path) or os.path.getsize(path) != size:
+            with open(path, 'wb') as f:
+                remaining = size
+                while remaining > 0:
+                    chunk = min(remaining, 1024 * 1024)
+                    f.write(os.urandom(chunk))
+                    remaining -= chunk
+        size_classes[format_file_size(size)] = [{
+            'path': path,
+            'name': os.path.basename(path),
+            'size': size
+        }]
+    return size_classes
+
+def run_sweep(config, csv_path, temp_dir="../temp_downloads"):
+    """Run the upload/retrieve workload over every backend configuration
+
+    Results stream to ``csv_path`` and an interrupted sweep resumes from its
+    manifest like a normal run. Resuming with a different sweep matrix
+    raises ValueError.
+    """
+    repetitions = config.get('repetitions', 3)
+    pause = config.get('pause_sec', 2)
+    size_classes = resolve_size_classes(config, temp_dir)
+
+    print("=== Starting Transfer-Parameter Sweep ===")
+    for size_class, files in size_classes.items():
+        print(f"  {size_class}: {len(files)} files")
+
+    with ResultWriter(csv_path, SWEEP_FIELDS, key_fields=CELL_FIELDS, run_config=config) as writer:
+        for backend, params in config.get('backends', {}).items():
+            client_class, _ = BACKENDS[backend]
+            grid = expand_grid(params)
+            print(f"\n🔧 {backend}: {len(grid)} configurations")
+
+            for combo in grid:
+                cid = config_id(combo)
+                cells = [{"storage_system": backend, "config_id": cid, "size_class": size_class,
+                          "file_name": file_info['name'], "repetition": rep}
+                         for size_class, files in size_classes.items()
+                         for file_info in files
+                         for rep in range(1, repetitions + 1)]
+                if all(writer.is_done(cell) for cell in cells):
+                    print(f"  Skipping {cid} (already recorded)")
+                    continue
+
+                # Knobs left at None fall back to the client's defaults
+                system = client_class(**{k: v for k, v in combo.items() if v is not None})
+                # Separate namespace per configuration so retrievals read this
+                # config's writes; only that namespace is cleared, so benchmark
+                # data such as the dedup store survives the sweep
+                prefix = f"sweep/{hashlib.md5(cid.encode()).hexdigest()[:8]}"
+                system.cleanup(prefix)
+                print(f"  ▶ {cid}")
+
+                for size_class, files in size_classes.items():
+                    for file_info in files:
+                        for rep in range(1, repetitions + 1):
+                            cell = {"storage_system": backend, "config_id": cid,
+                                    "size_class": size_class, "file_name": file_info['name'],
+                                    "repetition": rep}
+                            if writer.is_done(cell):
+                                continue
+                            result = measure_transfer(system, file_info,
+                                                      f"{prefix}/{rep}/{file_info['name']}",
+                                                      temp_dir, pause)
+                            result.update(cell)
+                            # Knobs left at the default (or not used by this backend)
+                            # stay empty so the columns read back as numbers
+                            for param in PARAM_FIELDS:
+                                value = combo.get(param)
+                                result[param] = '' if value is None else value
+                            writer.write(result)
+                            print(f"    {size_class:8} rep {rep} | "
+                                  f"⬆️ {result['upload_speed_mb_sec']:7.2f} MB/s | "
+                                  f"⬇️ {result['retrieval_speed_mb_sec']:7.2f} MB/s")
+        writer.finish()
+
+def measure_transfer(system, file_info, object_name, temp_dir, pause):
+    """Time one upload and retrieval of ``file_info`` and verify the download"""
+    file_size = file_info['size']
+
+    upload_start = time.time()
+    upload_success = system.upload_file(file_info['path'], object_name)
+    upload_time = time.time() - upload_start
+
+    time.sleep(pause)
+
+    download_path = os.path.join(temp_dir, f"sweep_download_{os.getpid()}")
+    retrieval_start = time.time()
+    retrieval_success = system.retrieve_file(object_name, download_path)
+    retrieval_time = time.time() - retrieval_start
+
+    download_verified = (retrieval_success and os.path.exists(download_path)
+                         and os.path.getsize(download_path) == file_size)
+    if os.path.exists(download_path):
+        os.remove(download_path)
+
+    return {
+        "file_size_bytes": file_size,
+        "upload_time_sec": round(upload_time, 4),
+        "upload_speed_mb_sec": round(file_size / upload_time / (1024**2) if upload_time > 0 else 0, 4),
+        "retrieval_time_sec": round(retrieval_time, 4),
+        "retrieval_speed_mb_sec": round(file_size / retrieval_time / (1024**2) if retrieval_time > 0 else 0, 4),
+        "upload_success": upload_success,
+        "retrieval_success": retrieval_success,
+        "download_verified": bool(download_verified),
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
+    }
+
+def load_sweep_results(csv_path):
+    """Read a sweep CSV with the knob columns as numbers, NaN meaning the default"""
+    df = pd.read_csv(csv_path)
+    for param in PARAM_FIELDS:
+        if param in df:
+            # Older sweeps wrote the string 'default'
+            df[param] = pd.to_numeric(df[param], errors='coerce')
+    return df
+
+def is_default_config(row):
+    """True if every knob of the row's backend was left at the library default"""
+    return all(pd.isna(row[param]) for param in BACKENDS[row['storage_system']][1] if param in row)
+
+def knob_labels(values):
+    """Axis labels for sorted knob values; the default (NaN) sorts first"""
+    return ['default' if value < 0 else str(int(value)) for value in values]
+
+def summarize_configs(df):
+    """Median throughput per backend, size class and configuration"""
+    default_ids = set(df[df.apply(is_default_config, axis=1)]['config_id'])
+    rows = []
+    for operation, column in OPERATIONS.items():
+        success_col = 'upload_success' if operation == 'upload' else 'retrieval_success'
+        ok = df[df[success_col] == True]
+        grouped = ok.groupby(['storage_system', 'size_class', 'config_id'])[column].median()
+        for (system, size_class, cid), speed in grouped.items():
+            rows.append({'storage_system': system, 'size_class': size_class, 'config_id': cid,
+                         'operation': operation, 'median_mb_sec': speed,
+                         'is_default': cid in default_ids})
+    return pd.DataFrame(rows, columns=['storage_system', 'size_class', 'config_id',
+                                       'operation', 'median_mb_sec', 'is_default'])
+
+def print_best_configs(summary):
+    """Print the fastest configuration per backend, size class and operation"""
+    print("\n🏆 BEST CONFIGURATION PER BACKEND AND SIZE CLASS")
+    print("=" * 60)
+    for (system, size_class, operation), group in summary.groupby(['storage_system', 'size_class', 'operation']):
+        best = group.loc[group['median_mb_sec'].idxmax()]
+        defaults = group[group['is_default']]
+        baseline = f" (defaults: {defaults['median_mb_sec'].iloc[0]:.2f} MB/s)" if len(defaults) else ""
+        print(f"   {system:8} | {size_class:10} | {operation:9} | "
+              f"{best['median_mb_sec']:8.2f} MB/s{baseline} | {best['config_id']}")
+
+def plot_heatmaps(df, output_dir):
+    """Heatmap of median throughput over the first two varied knobs
+
+    Other varied knobs are folded in by taking the best value, so each cell
+    shows the best throughput reachable with that pair of settings.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    saved = []
+
+    for (system, size_class), group in df.groupby(['storage_system', 'size_class']):
+        varied = [p for p in BACKENDS[system][1] if p in group and group[p].nunique(dropna=False) > 1]
+        if not varied:
+            continue
+
+        for operation, column in OPERATIONS.items():
+            success_col = 'upload_success' if operation == 'upload' else 'retrieval_success'
+            ok = group[group[success_col] == True]
+            if ok.empty:
+                continue
+
+            # -1 stands in for the default so it survives the pivot and sorts
+            # ahead of the numeric settings
+            per_config = ok.groupby('config_id').agg(
+                {**{p: 'first' for p in varied}, column: 'median'}).reset_index()
+            per_config[varied] = per_config[varied].fillna(-1)
+            if len(varied) == 1:
+                grid = per_config.pivot_table(index=varied[0], values=column, aggfunc='max')
+                grid.columns = [operation]
+            else:
+                grid = per_config.pivot_table(index=varied[0], columns=varied[1],
+                                              values=column, aggfunc='max')
+                grid = grid.sort_index(axis=1)
+                grid.columns = knob_labels(grid.columns)
+            grid = grid.sort_index()
+            grid.index = knob_labels(grid.index)
+
+            plt.figure(figsize=(8, 6))
+            sns.heatmap(grid, annot=True, fmt=".1f", cmap="viridis", cbar_kws={'label': 'MB/s'})
+            folded = f" (best over {', '.join(varied[2:])})" if len(varied) > 2 else ""
+            plt.title(f"{system} {operation} throughput | {size_class}{folded}")
+            plt.tight_layout()
+            path = os.path.join(output_dir, f"heatmap_{system}_{size_class}_{operation}.png".replace(' ', ''))
+            plt.savefig(path, dpi=150, bbox_inches='tight')
+            plt.close()
+            saved.append(path)
+
+    return saved
+
+def report_sweep(csv_path, output_dir):
+    """Print the best configurations and draw heatmaps for a sweep CSV"""
+    df = load_sweep_results(csv_path)
+    print(f"\n📊 Sweep data points: {len(df)}")
+    summary = summarize_configs(df)
+    summary.to_csv(os.path.join(output_dir, "sweep_summary.csv"), index=False)
+    print_best_configs(summary)
+
+    for path in plot_heatmaps(df, output_dir):
+        print(f"🗺️  Heatmap saved: {path}")
+
+def main(argv=None):
+    """Command-line entry point; returns 1 if an interrupted sweep cannot be resumed"""
+    parser = argparse.ArgumentParser(description="Sweep transfer parameters per storage backend")
+    parser.add_argument("config", help="sweep matrix (.yaml/.yml or .json)")
+    parser.add_argument("--output-dir", default="../results/sweep",
+                        help="directory for the sweep CSV, summary and heatmaps")
+    parser.add_argument("--report-only", action="store_true",
+                        help="skip running and only report on an existing sweep CSV")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    os.makedirs("../temp_downloads", exist_ok=True)
+    csv_path = os.path.join(args.output_dir, "sweep_results.csv")
+
+    if not args.report_only:
+        try:
+            config = load_sweep_config(args.config)
+        except ValueError as e:
+            parser.error(str(e))
+        # A finished sweep is started over; an interrupted one resumes
+        discard_unless_resumable(csv_path)
+        try:
+            run_sweep(config, csv_path)
+        except ValueError as e:
+            print(f"ERROR: refusing to resume {csv_path}: {e}")
+            print("Re-run with the original matrix, or delete the CSV and its manifest to start over")
+            return 1
+
+    report_sweep(csv_path, args.output_dir)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
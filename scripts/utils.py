@@ -1,5 +1,18 @@
+import hashlib
 import psutil
 import os
+import socket
+import time
+from urllib3.connection import HTTPConnection
+
+# Durability tiers shared by all clients so backends are compared at equal
+# write guarantees. Each client maps the tiers it can honor in its own
+# DURABILITY_LEVELS:
+#   default      - library/server defaults, as before
+#   acknowledged - primary copy acknowledged, no extra sync or replicas
+#   journaled    - acknowledged after the write reached the on-disk journal
+#   replicated   - acknowledged after a majority / full replica set has it
+DURABILITY_TIERS = ['default', 'acknowledged', 'journaled', 'replicated']
 
 def get_system_stats():
     """Get current system resource usage"""
@@ -9,6 +22,54 @@ def get_system_stats():
         'disk_usage': psutil.disk_usage('/').percent
     }
 
+def hash_file(file_path, chunk_size=1024 * 1024):
+    """Stream a file through SHA-256 and return (hex digest, seconds taken)"""
+    start = time.time()
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest(), time.time() - start
+
+def new_upload_stats():
+    """Per-upload deduplication stats reported by every client"""
+    return {
+        'dedup_hit': False,
+        'bytes_saved': 0,
+        'hash_time_sec': 0.0,
+        'lookup_time_sec': 0.0
+    }
+
+def lookup_content(file_path, stats, lookup):
+    """Hash ``file_path`` and look the digest up in a content-addressed store
+
+    ``lookup(digest)`` returns something truthy if the content is stored.
+    Clients key content by durability level and codec as well as digest, so
+    a hit never skips a write that would have been stored with a stronger
+    guarantee or in another encoding. Fills the dedup fields of ``stats``
+    and returns (digest, lookup result).
+    """
+    digest, hash_time = hash_file(file_path)
+    lookup_start = time.time()
+    found = lookup(digest)
+    stats.update({
+        'hash_time_sec': hash_time,
+        'lookup_time_sec': time.time() - lookup_start
+    })
+    if found:
+        stats.update({
+            'dedup_hit': True,
+            'bytes_saved': os.path.getsize(file_path)
+        })
+    return digest, found
+
+def socket_buffer_options(size):
+    """urllib3 socket options setting both kernel buffers to ``size`` bytes"""
+    return HTTPConnection.default_socket_options + [
+        (socket.SOL_SOCKET, socket.SO_SNDBUF, size),
+        (socket.SOL_SOCKET, socket.SO_RCVBUF, size)
+    ]
+
 def format_file_size(size_bytes):
     """Convert bytes to human readable format"""
     for unit in ['B', 'KB', 'MB', 'GB']: